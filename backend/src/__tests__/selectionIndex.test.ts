@@ -0,0 +1,64 @@
+import { buildSelectionIndex, pickRandomSong } from '../utils/selectionIndex';
+
+const raw = {
+  version: 1,
+  songs: {
+    ids: ['0001', '0002', '0003', '0004', '0005'],
+    years: [1985, 1991, 1998, 2004, 2007],
+    views: [10, 20, 30, 40, 50]
+  },
+  buckets: [
+    { decade: 1980, genre: 'Rock', songs: [0], weight: 1 },
+    { decade: 1990, genre: 'Pop', songs: [1, 2], weight: 2 },
+    { decade: 2000, genre: 'Pop', songs: [3], weight: 1 },
+    { decade: 2000, genre: 'Hindi', songs: [4], weight: 1 }
+  ]
+};
+
+const mongoIds = new Map(raw.songs.ids.map((id) => [id, `m${id}`]));
+
+// Deterministic "random" source cycling through evenly spaced values
+function sequence(n: number): () => number {
+  let i = 0;
+  return () => (i++ % n) / n + 1 / (2 * n);
+}
+
+function drawAll(filter: Parameters<typeof pickRandomSong>[1], draws = 50): Set<string> {
+  const index = buildSelectionIndex(raw, mongoIds);
+  const random = sequence(draws);
+  const picked = new Set<string>();
+  for (let i = 0; i < draws; i++) {
+    const song = pickRandomSong(index, filter, random);
+    if (song) picked.add(song.csvId);
+  }
+  return picked;
+}
+
+describe('selectionIndex', () => {
+  it('should reach every song when unfiltered', () => {
+    expect(drawAll({})).toEqual(new Set(['0001', '0002', '0003', '0004', '0005']));
+  });
+
+  it('should restrict by genre and decade', () => {
+    expect(drawAll({ genres: ['Pop'] })).toEqual(new Set(['0002', '0003', '0004']));
+    expect(drawAll({ decades: [2000] })).toEqual(new Set(['0004', '0005']));
+    expect(drawAll({ genres: ['Pop'], decades: [1990] })).toEqual(new Set(['0002', '0003']));
+  });
+
+  it('should apply minYear inside a partially matching decade', () => {
+    expect(drawAll({ minYear: 1995 })).toEqual(new Set(['0003', '0004', '0005']));
+  });
+
+  it('should return null when nothing matches', () => {
+    const index = buildSelectionIndex(raw, mongoIds);
+    expect(pickRandomSong(index, { genres: ['R&B'] })).toBeNull();
+    expect(pickRandomSong(index, { minYear: 2010 })).toBeNull();
+  });
+
+  it('should drop songs missing from the database', () => {
+    const index = buildSelectionIndex(raw, new Map([['0002', 'm0002']]));
+    expect(index.size).toBe(1);
+    expect(index.buckets).toHaveLength(1);
+    expect(pickRandomSong(index, {})?.id).toBe('m0002');
+  });
+});
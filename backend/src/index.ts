@@ -16,6 +16,7 @@ import statsRouter from './routes/stats';
 import songsRouter from './routes/songs';
 import audioRouter from './routes/audio';
 import leaderboardRouter from './routes/leaderboard';
+import { loadSelectionIndex } from './utils/selectionIndex';
 
 const app: Application = express();
 const PORT = process.env.PORT || 4000;
@@ -88,6 +89,8 @@ async function startServer() {
   try {
     await mongoose.connect(MONGODB_URI);
     console.log('✅ Connected to MongoDB');
+
+    await loadSelectionIndex();
     
     app.listen(PORT, () => {
       console.log(`🚀 Server running on http://localhost:${PORT}`);
@@ -3,6 +3,7 @@ import Song, { GENRES } from '../models/Song';
 import User from '../models/User';
 import { formatViewCount } from '../utils/viewCountFormatter';
 import { getAvailableAudioLevels } from '../utils/audioAvailability';
+import { getSelectionIndex, pickRandomSong, SelectionFilter } from '../utils/selectionIndex';
 import { optionalAuth, AuthedRequest } from '../middleware/auth';
 
 const router = Router();
@@ -23,6 +24,29 @@ function makePlayId(songId: unknown, scoreProfile: ScoreProfile): string {
   return `${songId}:${scoreProfile}`;
 }
 
+function roundResponse(
+  song: { id: string; release_year: number; viewcount: number },
+  scoreProfile: ScoreProfile,
+  availableLevels: number[]
+) {
+  return {
+    playId: makePlayId(song.id, scoreProfile),
+    scoreProfile,
+    availableLevels,
+    currentLevel: availableLevels[0],
+    song: {
+      id: song.id,
+      release_year: song.release_year,
+      viewcount_formatted: formatViewCount(song.viewcount),
+      audio_urls: {
+        level1: `/api/audio/${song.id}/level1`,
+        level2: `/api/audio/${song.id}/level2`,
+        level3: `/api/audio/${song.id}/level3`
+      }
+    }
+  };
+}
+
 function parsePlayId(rawId: string): { songId: string; scoreProfile: ScoreProfile } {
   const [songId, rawScoreProfile] = rawId.split(':');
   return {
@@ -130,6 +154,8 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
     const { mode = 'random', value, minYear, filtered, filterMode, decades, genres, includeHindi } = req.body;
 
     let query: any = {};
+    // Same criteria as `query`, in the shape the in-memory selection index takes
+    const selection: SelectionFilter = {};
     let scoreProfile: ScoreProfile = 'all';
 
     if (filterMode) {
@@ -152,6 +178,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
           return res.status(400).json({ error: `Invalid genre "${invalidGenre}". Must be one of: ${GENRES.join(', ')}` });
         }
         query.genre = { $in: genreValues };
+        selection.genres = genreValues;
       }
 
       if (filterMode === 'decade') {
@@ -164,6 +191,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
           return res.status(400).json({ error: 'Decade mode requires numeric values (e.g., 1990)' });
         }
         query.decade = { $in: parsedDecades };
+        selection.decades = parsedDecades;
       }
     } else if (filtered) {
       scoreProfile = 'reduced';
@@ -181,6 +209,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
         });
       }
       query.decade = { $in: parsedDecades };
+      selection.decades = parsedDecades;
 
       let genreList: string[] = Array.isArray(genres) && genres.length > 0 ? genres : SELECTABLE_GENRES;
       const invalidGenre = genreList.find((g) => !(SELECTABLE_GENRES as readonly string[]).includes(g));
@@ -191,6 +220,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
         genreList = [...genreList, 'Hindi'];
       }
       query.genre = { $in: genreList };
+      selection.genres = genreList;
     } else {
       if (!['random', 'decade'].includes(mode)) {
         return res.status(400).json({ error: 'Invalid mode. Must be "random" or "decade"' });
@@ -206,6 +236,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
           return res.status(400).json({ error: 'Decade must be a number (e.g., 1990)' });
         }
         query.decade = decade;
+        selection.decades = [decade];
       }
 
       if (minYear !== undefined && minYear !== null) {
@@ -215,6 +246,21 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
           return res.status(400).json({ error: 'minYear must be a number' });
         }
         query.release_year = { $gte: year };
+        selection.minYear = year;
+      }
+    }
+
+    // Fast path: pick from the precomputed index without touching the database
+    const selectionIndex = getSelectionIndex();
+    const indexed = selectionIndex ? pickRandomSong(selectionIndex, selection) : null;
+    if (indexed) {
+      const indexedLevels = getAvailableAudioLevels({
+        level1: `/preprocessed/${indexed.csvId}/level1.mp3`,
+        level2: `/preprocessed/${indexed.csvId}/level2.mp3`,
+        level3: `/preprocessed/${indexed.csvId}/level3.mp3`
+      });
+      if (indexedLevels.length > 0) {
+        return res.json(roundResponse(indexed, scoreProfile, indexedLevels));
       }
     }
 
@@ -245,22 +291,7 @@ router.post('/random', async (req: AuthedRequest, res: Response) => {
       return res.status(404).json({ error: 'No songs with playable audio found for the selected criteria' });
     }
 
-    res.json({
-      playId: makePlayId(song._id, scoreProfile),
-      scoreProfile,
-      availableLevels,
-      currentLevel: availableLevels[0],
-      song: {
-        id: song._id,
-        release_year: song.release_year,
-        viewcount_formatted: formatViewCount(song.viewcount),
-        audio_urls: {
-          level1: `/api/audio/${song._id}/level1`,
-          level2: `/api/audio/${song._id}/level2`,
-          level3: `/api/audio/${song._id}/level3`
-        }
-      }
-    });
+    res.json(roundResponse({ id: String(song._id), release_year: song.release_year, viewcount: song.viewcount }, scoreProfile, availableLevels));
   } catch (error) {
     console.error('Error picking random song:', error);
     res.status(500).json({ error: 'Internal server error' });
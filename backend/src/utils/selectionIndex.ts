@@ -0,0 +1,178 @@
+import fs from 'fs';
+import path from 'path';
+import Song from '../models/Song';
+
+/**
+ * In-memory random-song picker backed by backend/selection_index.json, which
+ * getting_the_data/build_selection_index.py builds offline from the CSV and
+ * artist_genres.json. Lets POST /api/songs/random pick a song without a
+ * countDocuments + skip() round-trip. If the file is missing (or a filter
+ * matches nothing in it) the route falls back to the database query.
+ */
+
+export interface SelectionFilter {
+  genres?: string[];
+  decades?: number[];
+  minYear?: number;
+}
+
+export interface IndexedSong {
+  id: string; // Mongo _id
+  csvId: string; // backend/preprocessed/<csvId>/
+  release_year: number;
+  viewcount: number;
+}
+
+interface Bucket {
+  decade: number;
+  genre: string;
+  weight: number;
+  songs: IndexedSong[]; // sorted by release_year
+  years: number[]; // parallel to songs, for the minYear binary search
+}
+
+export interface SelectionIndex {
+  buckets: Bucket[];
+  size: number;
+}
+
+interface RawSelectionIndex {
+  version: number;
+  songs: { ids: string[]; years: number[]; views: number[] };
+  buckets: Array<{ decade: number; genre: string; songs: number[]; weight: number }>;
+}
+
+let currentIndex: SelectionIndex | null = null;
+
+export function getSelectionIndex(): SelectionIndex | null {
+  return currentIndex;
+}
+
+export function setSelectionIndex(index: SelectionIndex | null): void {
+  currentIndex = index;
+}
+
+/**
+ * Turn the raw JSON into buckets of IndexedSong. `mongoIds` maps CSV IDs to
+ * Song _ids; songs without a database row are dropped (and so are buckets
+ * left empty), so every pick is guaranteed to be a real song.
+ */
+export function buildSelectionIndex(raw: RawSelectionIndex, mongoIds: Map<string, string>): SelectionIndex {
+  if (raw.version !== 1) {
+    throw new Error(`Unsupported selection index version ${raw.version}`);
+  }
+
+  const buckets: Bucket[] = [];
+  let size = 0;
+  for (const rawBucket of raw.buckets) {
+    const songs: IndexedSong[] = [];
+    for (const i of rawBucket.songs) {
+      const csvId = raw.songs.ids[i];
+      const id = mongoIds.get(csvId);
+      if (!id) continue;
+      songs.push({ id, csvId, release_year: raw.songs.years[i], viewcount: raw.songs.views[i] });
+    }
+    if (songs.length === 0) continue;
+
+    songs.sort((a, b) => a.release_year - b.release_year);
+    // Keep the offline weight, scaled down if some of the bucket's songs were dropped
+    const weight = (rawBucket.weight * songs.length) / rawBucket.songs.length;
+    buckets.push({ decade: rawBucket.decade, genre: rawBucket.genre, weight, songs, years: songs.map((s) => s.release_year) });
+    size += songs.length;
+  }
+  return { buckets, size };
+}
+
+function lowerBound(values: number[], target: number): number {
+  let lo = 0;
+  let hi = values.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (values[mid] < target) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/**
+ * Pick a song matching `filter`: choose a matching bucket in proportion to
+ * its weight, then a song uniformly within it. Cost is linear in the number
+ * of buckets (a few dozen decade/genre pairs), independent of catalogue size.
+ * Returns null when nothing matches.
+ */
+export function pickRandomSong(
+  index: SelectionIndex,
+  filter: SelectionFilter,
+  random: () => number = Math.random
+): IndexedSong | null {
+  const candidates: Array<{ bucket: Bucket; start: number; weight: number }> = [];
+  let totalWeight = 0;
+
+  for (const bucket of index.buckets) {
+    if (filter.genres && !filter.genres.includes(bucket.genre)) continue;
+    if (filter.decades && !filter.decades.includes(bucket.decade)) continue;
+
+    let start = 0;
+    if (filter.minYear !== undefined) {
+      if (bucket.decade + 9 < filter.minYear) continue;
+      start = lowerBound(bucket.years, filter.minYear);
+    }
+    const remaining = bucket.songs.length - start;
+    if (remaining <= 0) continue;
+
+    const weight = (bucket.weight * remaining) / bucket.songs.length;
+    candidates.push({ bucket, start, weight });
+    totalWeight += weight;
+  }
+
+  if (totalWeight <= 0) return null;
+
+  let r = random() * totalWeight;
+  for (const { bucket, start, weight } of candidates) {
+    if (r < weight) {
+      const offset = Math.floor((r / weight) * (bucket.songs.length - start));
+      return bucket.songs[Math.min(start + offset, bucket.songs.length - 1)];
+    }
+    r -= weight;
+  }
+  const last = candidates[candidates.length - 1];
+  return last.bucket.songs[last.bucket.songs.length - 1];
+}
+
+/**
+ * Load selection_index.json (SELECTION_INDEX_PATH overrides the default
+ * location) and resolve its CSV IDs to Song _ids with one query. Called once
+ * at startup, after the database connection is up.
+ */
+export async function loadSelectionIndex(): Promise<SelectionIndex | null> {
+  const indexPath = process.env.SELECTION_INDEX_PATH || path.join(__dirname, '../../selection_index.json');
+  if (!fs.existsSync(indexPath)) {
+    console.warn(`⚠️  No selection index at ${indexPath} - random picks will query MongoDB`);
+    setSelectionIndex(null);
+    return null;
+  }
+
+  // The index is only a fast path -- a bad file must not stop the server
+  let index: SelectionIndex;
+  try {
+    const raw: RawSelectionIndex = JSON.parse(fs.readFileSync(indexPath, 'utf-8'));
+
+    // Song has no CSV ID field; it's recoverable from the preprocessed path
+    const mongoIds = new Map<string, string>();
+    const songs = await Song.find({}).select('_id preprocessed.level1').lean();
+    for (const song of songs) {
+      const match = /^\/preprocessed\/([^/]+)\//.exec(song.preprocessed.level1);
+      if (match) mongoIds.set(decodeURIComponent(match[1]), String(song._id));
+    }
+
+    index = buildSelectionIndex(raw, mongoIds);
+  } catch (error) {
+    console.warn(`⚠️  Could not load selection index at ${indexPath} - random picks will query MongoDB:`, error);
+    setSelectionIndex(null);
+    return null;
+  }
+
+  setSelectionIndex(index);
+  console.log(`🎲 Loaded selection index: ${index.size} songs in ${index.buckets.length} buckets`);
+  return index;
+}
@@ -2,37 +2,41 @@ import pandas as pd
 import yt_dlp
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-import shutil
 import os
-from datetime import datetime
+import time
+
+from lookup_replay import replayable
+from snapshots import snapshot
 
 CSV_FILE = 'combined_songs_with_links.csv'
-BACKUP_DIR = 'temp_backups'
-MAX_WORKERS = 8  # concurrent yt-dlp searches
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 8))  # concurrent yt-dlp searches
 SAVE_EVERY = 25  # checkpoint frequency
 
-os.makedirs(BACKUP_DIR, exist_ok=True)
-
 
-def search_youtube_by_title(song_title, artist_name):
-    """Search YouTube (via yt-dlp, no API/quota involved), get the top 5 results,
-    and return the link + view count of whichever has the most views."""
-    query = f"ytsearch5:{song_title} {artist_name}"
+@replayable('yt_dlp.ytsearch5')
+def ytsearch5(query):
+    """Top 5 YouTube results for a query (via yt-dlp, no API/quota involved),
+    trimmed to the fields we use so recorded fixtures stay small."""
     opts = {'quiet': True, 'no_warnings': True, 'extract_flat': False}
     with yt_dlp.YoutubeDL(opts) as ydl:
-        info = ydl.extract_info(query, download=False)
-        entries = [e for e in (info.get('entries') or []) if e]
-        if not entries:
-            return None, None
-        best = max(entries, key=lambda e: e.get('view_count') or 0)
-        views = best.get('view_count')
-        link = best.get('webpage_url')
-        if link and views:
-            return link, views
-        return None, None
+        info = ydl.extract_info(f"ytsearch5:{query}", download=False)
+    return [{'webpage_url': e.get('webpage_url'), 'view_count': e.get('view_count')}
+            for e in (info.get('entries') or []) if e]
 
 
-ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+def search_youtube_by_title(song_title, artist_name):
+    """Get the top 5 YouTube results and return the link + view count of
+    whichever has the most views."""
+    entries = ytsearch5(f"{song_title} {artist_name}")
+    if not entries:
+        return None, None
+    best = max(entries, key=lambda e: e.get('view_count') or 0)
+    views = best.get('view_count')
+    link = best.get('webpage_url')
+    if link and views:
+        return link, views
+    return None, None
+
 
 # Read the combined CSV
 df = pd.read_csv(CSV_FILE)
@@ -40,7 +44,7 @@ df.columns = df.columns.str.strip()
 
 df['ViewCount'] = pd.to_numeric(df['ViewCount'], errors='coerce')
 
-shutil.copy(CSV_FILE, f'{BACKUP_DIR}/combined_songs_with_links_{ts}_pre_ytlinks.csv')
+snapshot(CSV_FILE, 'pre_ytlinks')
 
 # Only fetch for rows that don't already have a link (existing links/views are kept as-is)
 todo = df[df['YouTube_Link'].isna()].index.tolist()
@@ -63,6 +67,7 @@ def process_row(idx):
 
 lock = threading.Lock()
 completed = 0
+started = time.perf_counter()
 
 with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
     futures = {executor.submit(process_row, idx): idx for idx in todo}
@@ -81,11 +86,12 @@ with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
 
             if completed % SAVE_EVERY == 0:
                 df.to_csv(CSV_FILE, index=False)
-                shutil.copy(CSV_FILE, f'{BACKUP_DIR}/combined_songs_with_links_{ts}_progress_{completed}.csv')
+                snapshot(CSV_FILE, f'progress_{completed}')
                 print(f"   (checkpoint saved at {completed}/{len(todo)})")
 
 # Final save
 df.to_csv(CSV_FILE, index=False)
-shutil.copy(CSV_FILE, f'{BACKUP_DIR}/combined_songs_with_links_{ts}_final.csv')
+snapshot(CSV_FILE, 'final')
 
 print(f"\nDone. {df['YouTube_Link'].notna().sum()}/{len(df)} songs now have a YouTube link.")
+print(f"Lookups took {time.perf_counter() - started:.1f}s with {MAX_WORKERS} workers")
@@ -1,45 +1,59 @@
 import os
-import shutil
-import threading
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 import yt_dlp
 from yt_dlp.utils import download_range_func
 
+from download_scheduler import (CircuitBreaker, FailureStore, check_tools, run_with_retries,
+                                UNAVAILABLE, PERMANENT)
+from snapshots import snapshot
+
 # Configuration
 CSV_FILE = 'combined_songs_with_links.csv'
 OUTPUT_FOLDER = '../music_collection'
-BACKUP_DIR = 'temp_backups'
 START_TIME = 40  # seconds
 END_TIME = 65    # seconds
 MAX_WORKERS = 4  # concurrent downloads
+FAILURES_FILE = 'download_failures.json'  # unavailable/permanent IDs, skipped on later runs
+MAX_ATTEMPTS = 5     # per song, for transient/throttled failures
+BACKOFF_BASE = 2     # seconds; retry delay is jittered up to BACKOFF_BASE * 2**attempt
+BACKOFF_CAP = 120    # seconds
+BREAKER_THRESHOLD = 3   # throttled failures within BREAKER_WINDOW pause all downloads
+BREAKER_WINDOW = 30     # seconds
+BREAKER_COOLDOWN = 60   # seconds, doubled on each consecutive trip
+BREAKER_MAX_COOLDOWN = 900
+
+# Every download needs ffmpeg; fail here rather than erroring on every song
+check_tools()
 
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(BACKUP_DIR, exist_ok=True)
-
-ts = datetime.now().strftime('%Y%m%d_%H%M%S')
 
 # Read the CSV file (ID must stay a zero-padded string, e.g. "0001" -- otherwise
 # pandas infers it as an int and strips the leading zeros, breaking filenames)
 df = pd.read_csv(CSV_FILE, dtype={'ID': str})
 
-shutil.copy(CSV_FILE, f'{BACKUP_DIR}/combined_songs_with_links_{ts}_pre_download.csv')
+snapshot(CSV_FILE, 'pre_download')
 
 
-def download_song(row):
+def pending_status(row):
+    """Returns a skip status for rows that don't need a download, or None."""
     youtube_link = row['YouTube_Link']
-    song_name = row['Song']
-    song_id = row['ID']
 
     if pd.isna(youtube_link):
-        return song_name, 'skipped (no link)'
+        return 'skipped (no link)'
+
+    if os.path.exists(os.path.join(OUTPUT_FOLDER, f"{row['ID']}.mp3")):
+        return 'skipped (already exists)'
 
-    output_path = os.path.join(OUTPUT_FOLDER, f'{song_id}.mp3')
+    if failures.should_skip(row['ID'], youtube_link):
+        return f"skipped (previously {failures.entries[row['ID']]['kind']})"
 
-    if os.path.exists(output_path):
-        return song_name, 'skipped (already exists)'
+    return None
+
+
+def download_song(row):
+    """Downloads one clip; raises on failure so the scheduler can classify and retry it."""
+    output_path = os.path.join(OUTPUT_FOLDER, f"{row['ID']}.mp3")
 
     download_opts = {
         'format': 'bestaudio/best',
@@ -55,38 +69,65 @@ def download_song(row):
         'no_warnings': True,
     }
 
-    try:
-        with yt_dlp.YoutubeDL(download_opts) as ydl:
-            ydl.download([youtube_link])
-        return song_name, 'downloaded'
-    except Exception as e:
-        return song_name, f'error: {e}'
+    with yt_dlp.YoutubeDL(download_opts) as ydl:
+        ydl.download([row['YouTube_Link']])
+    return 'downloaded'
 
 
+failures = FailureStore(FAILURES_FILE)
 rows = [row for _, row in df.iterrows()]
-lock = threading.Lock()
 completed = 0
-counts = {'downloaded': 0, 'skipped': 0, 'error': 0}
-
-print(f"Processing {len(rows)} songs with {MAX_WORKERS} concurrent workers...\n")
-
-with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-    futures = {executor.submit(download_song, row): row['Song'] for row in rows}
-    for future in as_completed(futures):
-        song_name, status = future.result()
-        with lock:
-            completed += 1
-            if status == 'downloaded':
-                counts['downloaded'] += 1
-                symbol = 'OK'
-            elif status.startswith('skipped'):
-                counts['skipped'] += 1
-                symbol = 'SKIP'
-            else:
-                counts['error'] += 1
-                symbol = 'ERR'
-            safe_name = song_name.encode('ascii', 'replace').decode('ascii')
-            print(f"[{completed}/{len(rows)}] {symbol} {status}: {safe_name}")
-
-print(f"\nDone. Downloaded: {counts['downloaded']}, Skipped: {counts['skipped']}, Errors: {counts['error']}")
+counts = {'downloaded': 0, 'skipped': 0, 'retried': 0, 'error': 0}
+
+
+def report(song_name, symbol, status):
+    safe_name = song_name.encode('ascii', 'replace').decode('ascii')
+    print(f"[{completed}/{len(rows)}] {symbol} {status}: {safe_name}")
+
+
+todo = []
+for row in rows:
+    status = pending_status(row)
+    if status is None:
+        todo.append(row)
+    else:
+        completed += 1
+        counts['skipped'] += 1
+        report(row['Song'], 'SKIP', status)
+
+
+def on_event(row, event, detail):
+    global completed
+    if event == 'retry':
+        kind, attempt, delay, e = detail
+        counts['retried'] += 1
+        safe_name = row['Song'].encode('ascii', 'replace').decode('ascii')
+        print(f"   RETRY {attempt}/{MAX_ATTEMPTS - 1} in {delay:.1f}s ({kind}): {safe_name}")
+        return
+    if event == 'breaker_open':
+        print(f"   PAUSE too many throttled requests, pausing new downloads for {detail:.0f}s")
+        return
+
+    completed += 1
+    if event == 'done':
+        counts['downloaded'] += 1
+        report(row['Song'], 'OK', detail)
+    else:
+        kind, e = detail
+        counts['error'] += 1
+        if kind in (UNAVAILABLE, PERMANENT):
+            failures.add(row['ID'], row['YouTube_Link'], kind, str(e))
+            failures.save()
+        report(row['Song'], 'ERR', f'error ({kind}): {e}')
+
+
+print(f"\nProcessing {len(todo)} songs with {MAX_WORKERS} concurrent workers...\n")
+
+breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_WINDOW, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN)
+run_with_retries(todo, download_song, on_event, MAX_WORKERS, MAX_ATTEMPTS,
+                 BACKOFF_BASE, BACKOFF_CAP, breaker)
+
+print(f"\nDone. Downloaded: {counts['downloaded']}, Skipped: {counts['skipped']}, "
+      f"Retries: {counts['retried']}, Errors: {counts['error']}")
 print(f"Audio files saved in: {OUTPUT_FOLDER}/")
+print(f"Known unavailable/permanent failures: {len(failures.entries)} (see {FAILURES_FILE})")
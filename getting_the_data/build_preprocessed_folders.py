@@ -19,6 +19,8 @@ import shutil
 import os
 from pathlib import Path
 
+from mp3_probe import validate_tree
+
 ROOT = Path(__file__).resolve().parent.parent
 PREPROCESSED_DIR = ROOT / 'backend' / 'preprocessed'
 DRUMS_ZIP = ROOT / 'guess_the_song_drums.zip'
@@ -76,6 +78,11 @@ def main():
     drums_zf.close()
     instr_zf.close()
 
+    # Header-level integrity: truncation, corrupt frames, level mismatches
+    print('Probing MP3 frame headers...')
+    _, problems = validate_tree(PREPROCESSED_DIR)
+    errors.extend(problems)
+
     print(f'\nErrors: {len(errors)}')
     for e in errors[:20]:
         print(' ', e)
@@ -0,0 +1,124 @@
+"""
+Builds backend/selection_index.json, the precomputed pool the backend's
+POST /api/songs/random picks from instead of querying MongoDB on every round.
+
+Reads, relative to the repo root:
+- getting_the_data/combined_songs_with_links.csv  (ID, Song, Artist, Year, ViewCount, Genre)
+- getting_the_data/artist_genres.json             (Artist string -> genre)
+- backend/preprocessed/<ID>/level{1,2,3}.mp3      (only songs with all three are indexed)
+
+Songs are bucketed by (decade, genre). Each bucket holds indices into the
+parallel `songs` arrays, sorted by release year so the backend can apply a
+minYear cutoff with a binary search, plus a `weight` the backend samples
+buckets by. Weight is currently just the bucket's song count (uniform over
+songs, same as the old database pick) -- change it here, not in the backend,
+if some buckets should come up more often.
+
+Genre is resolved exactly as seed.ts resolveGenre does -- the CSV's Genre
+column, defaulting to Pop when blank or invalid -- so the index and the
+database fallback select from the same pool. artist_genres.json is joined
+only as a cross-check: rows whose CSV genre disagrees with it are counted
+and reported, so the CSV can be fixed and re-seeded.
+
+Run from the repo root after build_preprocessed_folders.py:
+    python getting_the_data/build_selection_index.py
+"""
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+CSV_FILE = ROOT / 'getting_the_data' / 'combined_songs_with_links.csv'
+GENRES_FILE = ROOT / 'getting_the_data' / 'artist_genres.json'
+PREPROCESSED_DIR = ROOT / 'backend' / 'preprocessed'
+OUTPUT_FILE = ROOT / 'backend' / 'selection_index.json'
+
+# Must match GENRES in backend/src/models/Song.ts
+GENRES = ['Pop', 'Rock', 'Hip-Hop', 'R&B', 'Hindi']
+LEVELS = ['level1.mp3', 'level2.mp3', 'level3.mp3']
+
+
+def has_all_levels(song_id):
+    song_dir = PREPROCESSED_DIR / song_id
+    return all((song_dir / lvl).is_file() and (song_dir / lvl).stat().st_size > 0 for lvl in LEVELS)
+
+
+def main():
+    df = pd.read_csv(CSV_FILE, dtype={'ID': str})
+    df.columns = df.columns.str.strip()
+    with open(GENRES_FILE, encoding='utf-8') as f:
+        artist_genres = json.load(f)
+
+    # The Hot 100 CSV calls it Year, the Spotify CSV calls it Release
+    year_column = 'Year' if 'Year' in df.columns else 'Release'
+
+    skipped = {'no id/year': 0, 'missing levels': 0}
+    defaulted_to_pop = 0
+    genre_mismatches = 0
+    songs = []
+    for _, row in df.iterrows():
+        song_id = str(row['ID']).strip() if pd.notna(row['ID']) else ''
+        year = pd.to_numeric(row[year_column], errors='coerce')
+        if not song_id or pd.isna(year):
+            skipped['no id/year'] += 1
+            continue
+
+        artist = str(row['Artist']).strip()
+        csv_genre = str(row.get('Genre', '')).strip()
+        # Same rule as resolveGenre in backend/src/scripts/seed.ts
+        genre = csv_genre if csv_genre in GENRES else 'Pop'
+        if csv_genre not in GENRES:
+            defaulted_to_pop += 1
+        if artist_genres.get(artist, genre) != genre:
+            genre_mismatches += 1
+
+        if not has_all_levels(song_id):
+            skipped['missing levels'] += 1
+            continue
+
+        views = pd.to_numeric(row.get('ViewCount'), errors='coerce')
+        songs.append({
+            'id': song_id,
+            'year': int(year),
+            'views': 0 if pd.isna(views) else int(views),
+            'genre': genre,
+        })
+
+    songs.sort(key=lambda s: (s['year'], s['id']))
+
+    buckets = {}
+    for i, song in enumerate(songs):
+        decade = song['year'] // 10 * 10
+        buckets.setdefault((decade, song['genre']), []).append(i)
+
+    index = {
+        'version': 1,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'songs': {
+            'ids': [s['id'] for s in songs],
+            'years': [s['year'] for s in songs],
+            'views': [s['views'] for s in songs],
+        },
+        'buckets': [
+            {'decade': decade, 'genre': genre, 'songs': members, 'weight': len(members)}
+            for (decade, genre), members in sorted(buckets.items())
+        ],
+    }
+
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    print(f'Indexed {len(songs)} songs into {len(buckets)} decade/genre buckets -> {OUTPUT_FILE}')
+    for reason, count in skipped.items():
+        print(f'  skipped ({reason}): {count}')
+    if defaulted_to_pop:
+        print(f'  note: {defaulted_to_pop} rows had no valid CSV Genre and were indexed as Pop (as seed.ts does)')
+    if genre_mismatches:
+        print(f'  note: {genre_mismatches} rows have a genre that differs from artist_genres.json '
+              f'-- fix the CSV and re-seed if those are wrong')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Retry scheduling for audio_downloader.py.
+
+Every failed download is classified into one of four kinds:
+- transient    network blips, timeouts, 5xx  -> requeued with jittered exponential backoff
+- throttled    429 / "not a bot" checks      -> requeued, and counted by the circuit breaker
+- unavailable  removed/private/blocked video -> recorded in the failure store, never retried
+- permanent    bad URL, unsupported site     -> recorded in the failure store, never retried
+
+The failure store is a small JSON file keyed by song ID. An entry is only
+honoured while the CSV still has the same YouTube link for that ID, so fixing a
+link in the CSV is enough to get the song retried on the next run.
+
+A missing local tool (ffmpeg/ffprobe) is not a problem with any one song, so
+it is never classified or stored per ID: run_with_retries raises
+MissingToolError and the run stops.
+"""
+import heapq
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+UNAVAILABLE = 'unavailable'
+PERMANENT = 'permanent'
+
+REQUIRED_TOOLS = ['ffmpeg', 'ffprobe']
+
+# Lower-cased substrings of yt-dlp error messages, checked in this order
+# (throttling first: a 429 message can also mention "unavailable").
+# The bot check is "confirm you're not a bot"; the age gate ("confirm your
+# age") must not match it and is classed as unavailable.
+_ERROR_PATTERNS = [
+    (THROTTLED, ['http error 429', 'too many requests', 'rate limit', 'rate-limit',
+                 'not a bot', 'temporarily blocked']),
+    (UNAVAILABLE, ['confirm your age', 'inappropriate for some users',
+                   'video unavailable', 'private video', 'has been removed', 'no longer available',
+                   'not available in your country', 'account associated with this video',
+                   'copyright', 'members-only', 'join this channel', 'age-restricted',
+                   'http error 404', 'http error 410']),
+    (PERMANENT, ['unsupported url', 'is not a valid url', 'incomplete youtube id',
+                 'no video formats found', 'requested format is not available']),
+]
+_MISSING_TOOL_PATTERNS = ['ffmpeg not found', 'ffprobe not found', 'ffprobe and ffmpeg not found']
+
+
+class MissingToolError(RuntimeError):
+    """A required local tool is missing; retrying or blacklisting songs can't help."""
+
+
+def check_tools():
+    """Raise MissingToolError unless ffmpeg and ffprobe are on PATH."""
+    missing = [tool for tool in REQUIRED_TOOLS if shutil.which(tool) is None]
+    if missing:
+        raise MissingToolError(f"{', '.join(missing)} not found on PATH -- install it before downloading")
+
+
+def classify_error(exc):
+    """Map a download exception to TRANSIENT, THROTTLED, UNAVAILABLE or PERMANENT.
+    Anything unrecognised is treated as transient so it gets a bounded number of retries."""
+    message = str(exc).lower()
+    for kind, needles in _ERROR_PATTERNS:
+        if any(needle in message for needle in needles):
+            return kind
+    return TRANSIENT
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Trips when `threshold` throttled failures land within `window` seconds.
+    While open, no new downloads are started. Each consecutive trip doubles the
+    cooldown (up to `max_cooldown`); a successful download resets it."""
+
+    def __init__(self, threshold, window, cooldown, max_cooldown):
+        self.threshold = threshold
+        self.window = window
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.open_until = 0.0
+        self._throttles = []
+
+    def record_throttle(self, now):
+        """Returns True if this throttle tripped the breaker."""
+        self._throttles = [t for t in self._throttles if now - t < self.window]
+        self._throttles.append(now)
+        if len(self._throttles) >= self.threshold and not self.is_open(now):
+            self.open_until = now + self.cooldown
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._throttles = []
+            return True
+        return False
+
+    def record_success(self):
+        self.cooldown = self.base_cooldown
+
+    def is_open(self, now):
+        return now < self.open_until
+
+
+class FailureStore:
+    """JSON-backed record of song IDs that failed as UNAVAILABLE or PERMANENT."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def should_skip(self, song_id, link):
+        entry = self.entries.get(song_id)
+        return entry is not None and entry['link'] == link
+
+    def add(self, song_id, link, kind, error):
+        self.entries[song_id] = {
+            'link': link,
+            'kind': kind,
+            'error': error[:300],
+            'failed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def run_with_retries(jobs, work, on_event, max_workers, max_attempts,
+                     backoff_base, backoff_cap, breaker):
+    """
+    Run `work(job)` for every job on a thread pool, requeueing failures.
+
+    `work` returns a status string on success and raises on failure. After each
+    finished attempt `on_event(job, event, detail)` is called from this (the
+    scheduling) thread, where event is one of:
+    - 'done'          detail = the status string returned by work
+    - 'retry'         detail = (kind, attempt, delay_seconds, exception)
+    - 'failed'        detail = (kind, exception) -- unavailable/permanent, or out of attempts
+    - 'breaker_open'  detail = cooldown seconds (job is the one that tripped it)
+    """
+    now = time.monotonic()
+    # Heap of (ready_at, seq, attempt, job); seq keeps ordering stable and avoids comparing jobs
+    queue = [(now, seq, 0, job) for seq, job in enumerate(jobs)]
+    heapq.heapify(queue)
+    seq = len(queue)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queue or in_flight:
+            now = time.monotonic()
+            while (queue and len(in_flight) < max_workers
+                   and queue[0][0] <= now and not breaker.is_open(now)):
+                _, _, attempt, job = heapq.heappop(queue)
+                in_flight[executor.submit(work, job)] = (attempt, job)
+
+            # Sleep until something finishes or the next queued job / breaker becomes ready
+            timeout = None
+            if queue and len(in_flight) < max_workers:
+                timeout = max(0.0, max(queue[0][0], breaker.open_until) - now)
+            if not in_flight:
+                time.sleep(timeout or 0)
+                continue
+            finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                attempt, job = in_flight.pop(future)
+                try:
+                    status = future.result()
+                except Exception as e:
+                    if any(needle in str(e).lower() for needle in _MISSING_TOOL_PATTERNS):
+                        # Let in-flight downloads finish, start nothing new, record nothing
+                        queue.clear()
+                        raise MissingToolError(str(e)) from e
+                    kind = classify_error(e)
+                    now = time.monotonic()
+                    if kind == THROTTLED and breaker.record_throttle(now):
+                        on_event(job, 'breaker_open', breaker.open_until - now)
+                    if kind in (UNAVAILABLE, PERMANENT) or attempt + 1 >= max_attempts:
+                        on_event(job, 'failed', (kind, e))
+                        continue
+                    delay = backoff_delay(attempt, backoff_base, backoff_cap)
+                    heapq.heappush(queue, (now + delay, seq, attempt + 1, job))
+                    seq += 1
+                    on_event(job, 'retry', (kind, attempt + 1, delay, e))
+                else:
+                    breaker.record_success()
+                    on_event(job, 'done', status)
@@ -0,0 +1,188 @@
+"""
+Record/replay layer for the network lookups in adding_yt_links.py,
+step2_only.py and spotifyplaylist.py.
+
+Controlled by environment variables, so the scripts run unchanged:
+
+    LOOKUP_MODE=live     (default) call the real services, nothing stored
+    LOOKUP_MODE=record   call the real services and store every response
+    LOOKUP_MODE=replay   answer from the fixture store only; no network
+
+    LOOKUP_FIXTURES      fixture file (default fixtures/lookups.json.gz, next to this file)
+    REPLAY_LATENCY_MS    mean delay added to every replayed call (default 0)
+    REPLAY_JITTER_MS     +/- uniform jitter around that delay (default 0)
+    REPLAY_ERROR_RATE    fraction of replayed calls that raise an injected error (default 0)
+    REPLAY_ERROR         message for injected errors (default 'HTTP Error 503: injected failure')
+    REPLAY_SEED          seed for jitter/error injection; with it set, the same calls get the
+                         same delays and failures regardless of thread timing or MAX_WORKERS
+
+Responses are keyed by a hash of the lookup name and its arguments and kept
+in one gzip-compressed JSON file. Exceptions raised while recording are stored
+too, so a replay fails in the same places the recorded run did.
+
+Example -- record once, then compare worker counts offline:
+    LOOKUP_MODE=record python adding_yt_links.py
+    LOOKUP_MODE=replay REPLAY_LATENCY_MS=800 REPLAY_JITTER_MS=400 MAX_WORKERS=16 python adding_yt_links.py
+
+`python lookup_replay.py` prints what the fixture store contains.
+"""
+import atexit
+import functools
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+MODE = os.environ.get('LOOKUP_MODE', 'live')
+FIXTURES_FILE = os.environ.get(
+    'LOOKUP_FIXTURES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'lookups.json.gz'))
+LATENCY_MS = float(os.environ.get('REPLAY_LATENCY_MS', 0))
+JITTER_MS = float(os.environ.get('REPLAY_JITTER_MS', 0))
+ERROR_RATE = float(os.environ.get('REPLAY_ERROR_RATE', 0))
+ERROR_MESSAGE = os.environ.get('REPLAY_ERROR', 'HTTP Error 503: injected failure')
+
+if MODE not in ('live', 'record', 'replay'):
+    raise ValueError(f"LOOKUP_MODE must be 'live', 'record' or 'replay', not {MODE!r}")
+
+SEED = os.environ.get('REPLAY_SEED')
+
+_lock = threading.Lock()
+_entries = None
+_occurrences = Counter()  # replayed calls per key, so repeats of a call draw fresh values
+
+
+class ReplayError(Exception):
+    """Raised in replay mode for injected failures and for recorded exceptions."""
+
+
+class FixtureMissing(LookupError):
+    """Raised in replay mode when a call was never recorded."""
+
+
+def _load():
+    global _entries
+    # Under the lock so concurrent first calls share one dict (otherwise
+    # entries recorded into a dict that loses the race are never saved)
+    with _lock:
+        if _entries is None:
+            if os.path.exists(FIXTURES_FILE):
+                with gzip.open(FIXTURES_FILE, 'rt', encoding='utf-8') as f:
+                    _entries = json.load(f)['entries']
+            else:
+                _entries = {}
+        return _entries
+
+
+def save():
+    """Write the fixture store (record mode only; also runs at exit)."""
+    if MODE != 'record' or _entries is None:
+        return
+    os.makedirs(os.path.dirname(FIXTURES_FILE) or '.', exist_ok=True)
+    tmp_path = f'{FIXTURES_FILE}.tmp'
+    with _lock:
+        payload = json.dumps({'version': 1, 'entries': _entries}, separators=(',', ':'))
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=9) as f:
+        f.write(payload)
+    os.replace(tmp_path, FIXTURES_FILE)
+
+
+if MODE == 'record':
+    atexit.register(save)
+
+
+def _key(name, args, kwargs):
+    blob = json.dumps([name, args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:20]
+
+
+def _replay(name, key):
+    entry = _load().get(key)
+    if entry is None:
+        raise FixtureMissing(f'no recorded response for {name} (key {key}); run with LOOKUP_MODE=record first')
+
+    # Randomness comes from the seed and the call itself (key + how many times
+    # it has been replayed), not from thread scheduling, so with a fixed seed
+    # the same calls get the same delays and failures for any worker count
+    with _lock:
+        _occurrences[key] += 1
+        occurrence = _occurrences[key]
+    rng = random.Random(f'{SEED}:{key}:{occurrence}') if SEED is not None else random.Random()
+
+    delay_ms = LATENCY_MS + rng.uniform(-JITTER_MS, JITTER_MS) if JITTER_MS else LATENCY_MS
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+    if ERROR_RATE and rng.random() < ERROR_RATE:
+        raise ReplayError(ERROR_MESSAGE)
+    if 'error' in entry:
+        raise ReplayError(entry['error'])
+    return entry['value']
+
+
+def call(name, fetch, *args, **kwargs):
+    """Run `fetch(*args, **kwargs)` through the record/replay layer.
+    Arguments are only used for the lookup key; the result must be JSON-serialisable."""
+    if MODE == 'live':
+        return fetch(*args, **kwargs)
+
+    key = _key(name, args, kwargs)
+    if MODE == 'replay':
+        return _replay(name, key)
+
+    entries = _load()
+    label = json.dumps(args, default=str)[:120]
+    try:
+        value = fetch(*args, **kwargs)
+    except Exception as e:
+        with _lock:
+            entries[key] = {'name': name, 'args': label, 'error': str(e)}
+        raise
+    with _lock:
+        entries[key] = {'name': name, 'args': label, 'value': value}
+    return value
+
+
+def replayable(name):
+    """Decorator form of call() for module-level lookup functions."""
+    def decorator(fetch):
+        @functools.wraps(fetch)
+        def wrapper(*args, **kwargs):
+            return call(name, fetch, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ReplayClient:
+    """Wraps a client object (e.g. spotipy.Spotify) so the listed methods go
+    through call(), under '<prefix>.<method>'. Other attributes pass through."""
+
+    def __init__(self, client, prefix, methods):
+        self._client = client
+        self._prefix = prefix
+        self._methods = set(methods)
+
+    def __getattr__(self, attr):
+        target = getattr(self._client, attr)
+        if attr not in self._methods:
+            return target
+        return functools.partial(call, f'{self._prefix}.{attr}', target)
+
+
+def main():
+    entries = _load()
+    if not entries:
+        print(f'No fixtures at {FIXTURES_FILE}')
+        return
+    by_name = Counter(e['name'] for e in entries.values())
+    errors = Counter(e['name'] for e in entries.values() if 'error' in e)
+    print(f'{FIXTURES_FILE}: {len(entries)} recorded responses, '
+          f'{os.path.getsize(FIXTURES_FILE) / 1024:.1f} KiB')
+    for name, count in sorted(by_name.items()):
+        print(f'  {name}: {count} ({errors[name]} errors)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Header-only integrity and duration probe for the preprocessed tree.
+
+Walks the MPEG frame headers of every backend/preprocessed/<ID>/level*.mp3
+without decoding any audio, so it catches what the 0-byte check in
+build_preprocessed_folders.py can't: truncated downloads, garbage in the
+middle of a stream, files shorter than their Xing/VBRI header claims, and
+levels of the same song that disagree on sample rate or duration.
+
+Per file it reports duration, average bitrate, frame count, sample rate and
+channel count, plus a list of problems (empty list = healthy). Files are
+probed in parallel across processes.
+
+Used by build_preprocessed_folders.py and trim_silence.py; can also be run
+on its own from the repo root:
+    python getting_the_data/mp3_probe.py [preprocessed_dir]
+"""
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PREPROCESSED_DIR = Path(__file__).resolve().parent.parent / 'backend' / 'preprocessed'
+MAX_DURATION_DRIFT = 1.0  # seconds the three levels of one song may differ by
+MAX_ERRORS_PER_FILE = 5   # stop listing resync problems after this many
+
+# Bitrates in kbps, indexed by [version is MPEG1][layer][bitrate index]
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+# Sample rates indexed by the 2-bit version field (1 = reserved)
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+_unpack_u32 = struct.Struct('>I').unpack_from
+
+
+def parse_frame_header(header):
+    """Decode a 32-bit MPEG audio frame header.
+    Returns (frame_length, samples_per_frame, sample_rate, channels, is_mpeg1) or None if invalid."""
+    if header >> 21 != 0x7FF:
+        return None
+    version = (header >> 19) & 3
+    layer = 4 - ((header >> 17) & 3)
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        # reserved values, or free-format bitrate (can't be sized from the header alone)
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 1
+    channels = 1 if (header >> 6) & 3 == 3 else 2
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, channels, mpeg1
+    samples = 576 if layer == 3 and not mpeg1 else 1152
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, channels, mpeg1
+
+
+def _id3v2_size(data):
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _info_header(data, pos, end, mpeg1, channels):
+    """Read the Xing/Info or VBRI header inside the first frame, if any.
+    Returns (tag, frames, bytes, complete) with None for fields the header
+    doesn't carry; complete is False when the file ends inside the header."""
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    xing = pos + 4 + side_info
+    tag = data[xing:xing + 4]
+    if tag in (b'Xing', b'Info'):
+        if xing + 8 > end:
+            return tag.decode(), None, None, False
+        flags = _unpack_u32(data, xing + 4)[0]
+        offset = xing + 8
+        if offset + 4 * ((flags & 1) + ((flags >> 1) & 1)) > end:
+            return tag.decode(), None, None, False
+        frames = total_bytes = None
+        if flags & 1:
+            frames = _unpack_u32(data, offset)[0]
+            offset += 4
+        if flags & 2:
+            total_bytes = _unpack_u32(data, offset)[0]
+        return tag.decode(), frames, total_bytes, True
+    vbri = pos + 36
+    if data[vbri:vbri + 4] == b'VBRI':
+        if vbri + 18 > end:
+            return 'VBRI', None, None, False
+        total_bytes, frames = struct.unpack_from('>II', data, vbri + 10)
+        return 'VBRI', frames, total_bytes, True
+    return None, None, None, True
+
+
+def _find_sync(data, pos, end):
+    """Next offset >= pos holding a valid header whose following frame also syncs."""
+    while True:
+        pos = data.find(b'\xff', pos, end - 3)
+        if pos < 0:
+            return -1
+        info = parse_frame_header(_unpack_u32(data, pos)[0])
+        if info is not None:
+            nxt = pos + info[0]
+            if nxt + 4 > end or parse_frame_header(_unpack_u32(data, nxt)[0]) is not None:
+                return pos
+        pos += 1
+
+
+def probe_mp3(path):
+    """Probe one MP3 by its frame headers. Returns a dict with path, duration
+    (seconds), bitrate (average kbps), frames, sample_rate, channels and
+    errors (list of strings, empty when the file looks intact)."""
+    result = {'path': str(path), 'duration': 0.0, 'bitrate': 0, 'frames': 0,
+              'sample_rate': 0, 'channels': 0, 'errors': []}
+    errors = result['errors']
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        errors.append(f'unreadable: {e}')
+        return result
+
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128  # ID3v1
+    start = _id3v2_size(data)
+    if end - start < 4:
+        errors.append('empty' if not data else 'no audio data')
+        return result
+
+    pos = _find_sync(data, start, end)
+    if pos < 0:
+        errors.append('no MPEG frames found')
+        return result
+    if pos != start:
+        errors.append(f'{pos - start} junk bytes before first frame')
+
+    header = _unpack_u32(data, pos)[0]
+    first = parse_frame_header(header)
+    _, samples_per_frame, sample_rate, channels, mpeg1 = first
+    result['sample_rate'] = sample_rate
+    result['channels'] = channels
+
+    tag, tag_frames, tag_bytes, complete = _info_header(data, pos, end, mpeg1, channels)
+    if not complete or (tag is not None and pos + first[0] > end):
+        errors.append(f'truncated: file ends inside the {tag} header')
+        return result
+    audio_start = pos
+    if tag is not None:
+        pos += first[0]  # the Xing/VBRI frame carries no audio
+        audio_start = pos
+
+    # Headers repeat constantly (a CBR stream has two: with/without padding), so
+    # decode each distinct one once and the walk is a dict lookup per frame
+    cache = {header: first}
+    frames = 0
+    samples = 0
+    while pos + 4 <= end:
+        header = _unpack_u32(data, pos)[0]
+        info = cache.get(header)
+        if info is None:
+            info = parse_frame_header(header)
+            if info is not None and info[2] != sample_rate:
+                info = None
+                if len(errors) < MAX_ERRORS_PER_FILE:
+                    errors.append(f'sample rate changes mid-stream at byte {pos}')
+            if info is None:
+                resync = _find_sync(data, pos + 1, end)
+                if len(errors) < MAX_ERRORS_PER_FILE:
+                    lost = (resync if resync >= 0 else end) - pos
+                    errors.append(f'corrupt frame at byte {pos} ({lost} bytes skipped)')
+                if resync < 0:
+                    pos = end
+                    break
+                pos = resync
+                continue
+            cache[header] = info
+        pos += info[0]
+        frames += 1
+        samples += info[1]
+
+    if pos > end:
+        errors.append(f'truncated: last frame is missing {pos - end} bytes')
+        frames -= 1
+        samples -= samples_per_frame
+    elif end - pos > 0:
+        errors.append(f'{end - pos} trailing bytes after last frame')
+    if tag_frames is not None and frames < tag_frames:
+        errors.append(f'truncated: {frames} of {tag_frames} frames ({tag} header)')
+    elif tag_bytes is not None and end - audio_start < tag_bytes - first[0] - 4:
+        errors.append(f'truncated: {end - audio_start} of {tag_bytes} bytes ({tag} header)')
+    if frames <= 0:
+        errors.append('no complete audio frames')
+        return result
+
+    duration = samples / sample_rate
+    result['frames'] = frames
+    result['duration'] = round(duration, 3)
+    result['bitrate'] = round((min(pos, end) - audio_start) * 8 / duration / 1000)
+    return result
+
+
+def check_song(levels, max_duration_drift=MAX_DURATION_DRIFT):
+    """Cross-level checks for one song, given {level filename: probe result}.
+    Pass max_duration_drift=None to skip the duration comparison."""
+    problems = []
+    healthy = {lvl: r for lvl, r in levels.items() if not r['errors']}
+    rates = {r['sample_rate'] for r in healthy.values()}
+    if len(rates) > 1:
+        problems.append('sample rates differ: ' + ', '.join(
+            f"{lvl} {r['sample_rate']} Hz" for lvl, r in sorted(healthy.items())))
+    if max_duration_drift is not None and len(healthy) > 1:
+        durations = [r['duration'] for r in healthy.values()]
+        if max(durations) - min(durations) > max_duration_drift:
+            problems.append('durations differ: ' + ', '.join(
+                f"{lvl} {r['duration']:.2f}s" for lvl, r in sorted(healthy.items())))
+    return problems
+
+
+def probe_tree(root=PREPROCESSED_DIR, workers=None):
+    """Probe every <root>/<ID>/level*.mp3 in parallel.
+    Returns {song_id: {level filename: probe result}}."""
+    paths = sorted(Path(root).glob('*/level*.mp3'))
+    results = {}
+    if not paths:
+        return results
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 64:
+        # Not worth the process start-up cost
+        probed = list(map(probe_mp3, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(16, len(paths) // (workers * 8))
+            probed = list(executor.map(probe_mp3, paths, chunksize=chunksize))
+    for path, result in zip(paths, probed):
+        results.setdefault(path.parent.name, {})[path.name] = result
+    return results
+
+
+def validate_tree(root=PREPROCESSED_DIR, max_duration_drift=MAX_DURATION_DRIFT, workers=None):
+    """Probe the whole tree and collect problems.
+    Returns (results, problems) where problems is a list of '<ID>/<level>: message' strings."""
+    results = probe_tree(root, workers)
+    problems = []
+    for song_id, levels in sorted(results.items()):
+        for lvl, result in sorted(levels.items()):
+            problems.extend(f'{song_id}/{lvl}: {e}' for e in result['errors'])
+        problems.extend(f'{song_id}: {p}' for p in check_song(levels, max_duration_drift))
+    return results, problems
+
+
+def main():
+    root = Path(sys.argv[1]) if len(sys.argv) > 1 else PREPROCESSED_DIR
+    if not root.exists():
+        print(f'Error: Directory not found: {root}')
+        return
+
+    started = time.perf_counter()
+    results, problems = validate_tree(root)
+    elapsed = time.perf_counter() - started
+
+    file_count = sum(len(levels) for levels in results.values())
+    durations = [r['duration'] for levels in results.values() for r in levels.values() if not r['errors']]
+    print(f'Probed {file_count} files in {len(results)} song folders in {elapsed:.2f}s')
+    if durations:
+        print(f'Duration: min {min(durations):.2f}s, max {max(durations):.2f}s, '
+              f'mean {sum(durations) / len(durations):.2f}s')
+    print(f'Problems: {len(problems)}')
+    for p in problems[:50]:
+        print(' ', p)
+    if len(problems) > 50:
+        print(f'  ... and {len(problems) - 50} more')
+
+
+if __name__ == '__main__':
+    main()
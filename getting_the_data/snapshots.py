@@ -0,0 +1,244 @@
+"""
+Compressed, deduplicated snapshots of the dataset CSV, replacing the full
+timestamped copies adding_yt_links.py and audio_downloader.py used to drop
+into temp_backups/.
+
+A snapshot is a small JSON manifest (temp_backups/snapshots/<id>.json)
+listing content hashes of the file's chunks; each chunk is stored once,
+gzip-compressed, under temp_backups/chunks/. Chunk boundaries are picked from
+the content of the lines themselves (a line whose CRC has its low bits zero
+ends a chunk), so filling in one row's YouTube link, or dropping a few rows,
+only produces one or two new chunks -- a checkpoint costs a hash of the file
+plus a few KB of writes instead of a full copy.
+
+Retention: per source file and label family, the newest KEEP_LAST snapshots
+are kept, plus the newest snapshot of each of the last KEEP_DAILY days. The
+family is the label without a trailing counter ('progress_25' -> 'progress'),
+so a run's many progress checkpoints never push out its own 'pre_ytlinks'
+snapshot, or another script's 'pre_download'. Everything else, and any chunk
+no remaining snapshot references, is removed after each snapshot.
+
+Full CSV copies left in temp_backups/ by the old shutil.copy backups
+(<stem>_<YYYYmmdd_HHMMSS>_<label>.csv) are imported by prune() as snapshots
+with their original label and timestamp, then deleted, so they fall under
+the same retention policy.
+
+Command line (run from getting_the_data/):
+    python snapshots.py list [source]
+    python snapshots.py restore <snapshot id> [destination]   (default: overwrite the source)
+    python snapshots.py prune
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+
+BACKUP_DIR = 'temp_backups'
+KEEP_LAST = 10
+KEEP_DAILY = 14
+
+# Content-defined chunking over lines: average ~128 lines per chunk
+CHUNK_MASK = 0x7F
+MIN_CHUNK_LINES = 16
+MAX_CHUNK_LINES = 1024
+
+
+def _split_chunks(data):
+    chunks = []
+    current = []
+    for line in data.splitlines(keepends=True):
+        current.append(line)
+        if len(current) >= MAX_CHUNK_LINES or (
+                len(current) >= MIN_CHUNK_LINES and zlib.crc32(line) & CHUNK_MASK == 0):
+            chunks.append(b''.join(current))
+            current = []
+    if current:
+        chunks.append(b''.join(current))
+    return chunks
+
+
+def _write_atomic(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _label_family(label):
+    return re.sub(r'_\d+$', '', label)
+
+
+# Old-style full copies: combined_songs_with_links_20250101_120000_progress_25.csv
+_LEGACY_NAME = re.compile(r'^(?P<stem>.+)_(?P<ts>\d{8}_\d{6})_(?P<label>[A-Za-z0-9_]+)\.csv$')
+
+
+def _dirs(backup_dir):
+    return os.path.join(backup_dir, 'chunks'), os.path.join(backup_dir, 'snapshots')
+
+
+def _store(data, source, label, created, backup_dir):
+    chunk_dir, manifest_dir = _dirs(backup_dir)
+    os.makedirs(chunk_dir, exist_ok=True)
+    os.makedirs(manifest_dir, exist_ok=True)
+
+    hashes = []
+    for chunk in _split_chunks(data):
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_path = os.path.join(chunk_dir, f'{digest}.gz')
+        if not os.path.exists(chunk_path):
+            _write_atomic(chunk_path, gzip.compress(chunk, compresslevel=6, mtime=0))
+        hashes.append(digest)
+
+    snapshot_id = f"{os.path.splitext(source)[0]}_{created.strftime('%Y%m%d_%H%M%S_%f')}_{label}"
+    manifest = {
+        'id': snapshot_id,
+        'source': source,
+        'label': label,
+        'created': created.isoformat(timespec='seconds'),
+        'size': len(data),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'chunks': hashes,
+    }
+    _write_atomic(os.path.join(manifest_dir, f'{snapshot_id}.json'), json.dumps(manifest).encode('utf-8'))
+    return snapshot_id
+
+
+def snapshot(path, label, backup_dir=BACKUP_DIR):
+    """Store a snapshot of `path` tagged with `label` (e.g. 'pre_download',
+    'progress_25'), apply retention, and return the snapshot id."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    snapshot_id = _store(data, os.path.basename(path), label, datetime.now(), backup_dir)
+    prune(backup_dir)
+    return snapshot_id
+
+
+def migrate_legacy(backup_dir=BACKUP_DIR):
+    """Import old full-copy backups from `backup_dir` as snapshots (keeping
+    their label and timestamp) and delete the copies. Returns how many."""
+    if not os.path.isdir(backup_dir):
+        return 0
+    migrated = 0
+    for name in sorted(os.listdir(backup_dir)):
+        match = _LEGACY_NAME.match(name)
+        path = os.path.join(backup_dir, name)
+        if not match or not os.path.isfile(path):
+            continue
+        created = datetime.strptime(match['ts'], '%Y%m%d_%H%M%S')
+        with open(path, 'rb') as f:
+            data = f.read()
+        _store(data, f"{match['stem']}.csv", match['label'], created, backup_dir)
+        os.remove(path)
+        migrated += 1
+    return migrated
+
+
+def list_snapshots(backup_dir=BACKUP_DIR, source=None):
+    """Manifests, oldest first, optionally only those of one source file."""
+    _, manifest_dir = _dirs(backup_dir)
+    if not os.path.isdir(manifest_dir):
+        return []
+    manifests = []
+    for name in os.listdir(manifest_dir):
+        if name.endswith('.json'):
+            with open(os.path.join(manifest_dir, name), encoding='utf-8') as f:
+                manifest = json.load(f)
+            if source is None or manifest['source'] == source:
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda m: (m['created'], m['id']))
+
+
+def restore(snapshot_id, destination=None, backup_dir=BACKUP_DIR):
+    """Rebuild a snapshot's file at `destination` (default: the source file
+    in the current directory), verifying its checksum. Returns the path."""
+    chunk_dir, manifest_dir = _dirs(backup_dir)
+    manifest_path = os.path.join(manifest_dir, f'{snapshot_id}.json')
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f'No snapshot {snapshot_id} in {manifest_dir}')
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    parts = []
+    for digest in manifest['chunks']:
+        with open(os.path.join(chunk_dir, f'{digest}.gz'), 'rb') as f:
+            parts.append(gzip.decompress(f.read()))
+    data = b''.join(parts)
+    if hashlib.sha256(data).hexdigest() != manifest['sha256']:
+        raise ValueError(f'Snapshot {snapshot_id} failed its checksum -- chunk store is damaged')
+
+    destination = destination or manifest['source']
+    _write_atomic(destination, data)
+    return destination
+
+
+def prune(backup_dir=BACKUP_DIR, keep_last=KEEP_LAST, keep_daily=KEEP_DAILY):
+    """Import any legacy full copies, apply the retention policy and delete
+    unreferenced chunks. Returns (legacy copies migrated, snapshots removed,
+    chunks removed)."""
+    migrated = migrate_legacy(backup_dir)
+    chunk_dir, manifest_dir = _dirs(backup_dir)
+    by_source = {}
+    for manifest in list_snapshots(backup_dir):
+        by_source.setdefault(manifest['source'], []).append(manifest)
+
+    keep = set()
+    for manifests in by_source.values():
+        newest_first = manifests[::-1]
+        by_family = {}
+        for m in newest_first:
+            by_family.setdefault(_label_family(m['label']), []).append(m['id'])
+        for ids in by_family.values():
+            keep.update(ids[:keep_last])
+        newest_per_day = {}  # insertion order is newest day first
+        for m in newest_first:
+            newest_per_day.setdefault(m['created'][:10], m['id'])
+        keep.update(list(newest_per_day.values())[:keep_daily])
+
+    removed_snapshots = 0
+    referenced = set()
+    for manifests in by_source.values():
+        for m in manifests:
+            if m['id'] in keep:
+                referenced.update(m['chunks'])
+            else:
+                os.remove(os.path.join(manifest_dir, f"{m['id']}.json"))
+                removed_snapshots += 1
+
+    removed_chunks = 0
+    if os.path.isdir(chunk_dir):
+        for name in os.listdir(chunk_dir):
+            if name.endswith('.gz') and name[:-3] not in referenced:
+                os.remove(os.path.join(chunk_dir, name))
+                removed_chunks += 1
+    return migrated, removed_snapshots, removed_chunks
+
+
+def main():
+    usage = 'usage: python snapshots.py list [source] | restore <snapshot id> [destination] | prune'
+    if len(sys.argv) < 2:
+        print(usage)
+        return
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == 'list':
+        manifests = list_snapshots(source=args[0] if args else None)
+        for m in manifests:
+            print(f"{m['id']}  {m['size']:>10,} bytes  {len(m['chunks'])} chunks")
+        print(f'{len(manifests)} snapshots')
+    elif command == 'restore' and args:
+        path = restore(args[0], args[1] if len(args) > 1 else None)
+        print(f'Restored {args[0]} -> {path}')
+    elif command == 'prune':
+        migrated, removed_snapshots, removed_chunks = prune()
+        print(f'Migrated {migrated} legacy CSV copies; removed {removed_snapshots} snapshots '
+              f'and {removed_chunks} unreferenced chunks')
+    else:
+        print(usage)
+
+
+if __name__ == '__main__':
+    main()
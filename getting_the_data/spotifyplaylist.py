@@ -3,6 +3,8 @@ import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 import pandas as pd
 
+from lookup_replay import ReplayClient
+
 def get_playlist_tracks(sp, playlist_id_or_url):
     """
     Extract all tracks from a Spotify playlist (supports URL or ID).
@@ -68,6 +70,8 @@ def fetch_multiple_playlists(playlists, client_id, client_secret, output_file='s
         client_secret=client_secret
     )
     sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+    # Record/replay hook for offline runs -- see lookup_replay.py
+    sp = ReplayClient(sp, 'spotify', ['playlist', 'playlist_tracks', 'next'])
 
     dfs = []
     for p in playlists:
@@ -9,6 +9,8 @@ from pathlib import Path
 from pydub import AudioSegment
 from pydub.silence import detect_leading_silence
 
+from mp3_probe import probe_tree, validate_tree
+
 # Configuration
 PREPROCESSED_DIR = Path(__file__).parent.parent / "backend" / "preprocessed"
 SILENCE_THRESHOLD = -40  # dBFS threshold for silence detection (lower = more sensitive)
@@ -92,6 +94,9 @@ def main():
     trimmed = 0
     deleted = 0
     errors = 0
+
+    # Header-only probe first, so corrupt files are reported instead of handed to pydub
+    probes = probe_tree(PREPROCESSED_DIR)
     
     # Process each song folder
     for song_folder in sorted(PREPROCESSED_DIR.iterdir()):
@@ -108,7 +113,11 @@ def main():
                 continue
             
             processed += 1
-            success, message = process_audio_file(level_path)
+            probe_errors = probes.get(song_folder.name, {}).get(level, {}).get('errors')
+            if probe_errors:
+                success, message = False, f"corrupt ({'; '.join(probe_errors)})"
+            else:
+                success, message = process_audio_file(level_path)
             
             if success:
                 if "trimmed" in message:
@@ -132,5 +141,12 @@ def main():
     print(f"  Errors: {errors}")
     print("=" * 60)
 
+    # Re-check the re-encoded output; levels are trimmed independently, so
+    # their durations are expected to differ and only integrity is compared
+    _, problems = validate_tree(PREPROCESSED_DIR, max_duration_drift=None)
+    print(f"Post-trim integrity problems: {len(problems)}")
+    for problem in problems[:20]:
+        print(f"  ✗ {problem}")
+
 if __name__ == "__main__":
     main()